@@ -3,7 +3,22 @@ import os
 import sys
 import json
 import re
-from github import Github
+import time
+import random
+import operator
+import functools
+import itertools
+import queue
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# orjson is optional - it's only used to speed up JSON reads and writes
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configuration - Components to check for updates
 COMPONENTS = {
@@ -30,61 +45,420 @@ COMPONENTS = {
     }
 }
 
-def get_github_release_info(repo_name, check_tag_format=None):
-    """Get the latest release version from GitHub repository"""
+# Seconds to wait for each GitHub API request, and for all component lookups to finish
+FETCH_TIMEOUT = 10
+LOOKUP_TIMEOUT = 90
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_GRAPHQL_URL = f"{GITHUB_API_URL}/graphql"
+
+# Tag formats accepted for components with a check_tag_format
+SEMVER_RE = re.compile(r'^\d+\.\d+\.\d+$', re.ASCII)
+CONTROLLER_TAG_RE = re.compile(r'-controller-')
+
+# Buffer size for JSON writes through the stdlib json module
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# Per-repo release lookups cached between runs, and how long a cached version is reused without asking GitHub
+RELEASE_CACHE_DIR = ".cache/releases"
+RELEASE_CACHE_TTL = 3600
+
+# Attempts for requests rejected by GitHub rate limiting, and the longest we'll wait between them
+RATE_LIMIT_ATTEMPTS = 6
+MAX_RATE_LIMIT_WAIT = 60
+
+# Shared HTTP session for all GitHub API calls
+session = requests.Session()
+session.headers.update({"Accept": "application/vnd.github+json"})
+if os.environ.get("GITHUB_TOKEN"):
+    session.headers["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+
+# Transient server errors are retried by the adapter, honoring Retry-After.
+# Rate limits (403/429) are left to github_get() so its wait cap applies.
+# The pool keeps one connection per lookup worker alive so every fetch reuses it.
+session.mount("https://", HTTPAdapter(
+    pool_maxsize=len(COMPONENTS),
+    max_retries=Retry(
+        total=5,
+        backoff_factor=2,
+        status_forcelist=[502, 503, 504],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+))
+
+def get_rate_limit_delay(response, attempt):
+    """Return how long to wait before retrying a rate-limited response, or None if it shouldn't be retried"""
+    if response.status_code not in (403, 429):
+        return None
+    
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return int(retry_after)
+    
+    # Primary rate limit exhausted - wait for the reset window
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        reset = response.headers.get("X-RateLimit-Reset")
+        if reset and reset.isdigit():
+            return max(0, int(reset) - time.time()) + random.random()
+    
+    # Secondary rate limits don't always say how long to wait
+    if response.status_code == 429:
+        return min(MAX_RATE_LIMIT_WAIT, 2 ** attempt) + random.random()
+    
+    return None
+
+def github_get(url, deadline=None, **kwargs):
+    """GET a GitHub API URL, backing off while rate limited
+
+    No attempt or wait is started past the deadline (a time.time() value), if given.
+    """
+    for attempt in range(RATE_LIMIT_ATTEMPTS):
+        timeout = FETCH_TIMEOUT
+        if deadline:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError(f"Lookup deadline passed before requesting {url}")
+            timeout = min(timeout, remaining)
+        
+        response = session.get(url, timeout=timeout, **kwargs)
+        delay = get_rate_limit_delay(response, attempt)
+        
+        # Give up if not rate limited, out of attempts, or the reset is too far away
+        if delay is None or attempt == RATE_LIMIT_ATTEMPTS - 1 or delay > MAX_RATE_LIMIT_WAIT:
+            return response
+        if deadline and time.time() + delay >= deadline:
+            return response
+        
+        print(f"Rate limited by GitHub on {url}, retrying in {delay:.0f}s", file=sys.stderr)
+        time.sleep(delay)
+    
+    return response
+
+def load_json(path):
+    """Load a JSON file, using orjson when available"""
+    if orjson:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dump_json(data, path):
+    """Atomically write data to a JSON file with 2-space indentation, using orjson when available"""
+    # Write to a temporary file first so readers never see a partially written file
+    tmp_path = f"{path}.tmp"
     try:
-        g = Github(os.environ.get("GITHUB_TOKEN", ""))
-        repo = g.get_repo(repo_name)
-        releases = repo.get_releases()
+        if orjson:
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+        else:
+            # json.dump writes in many small chunks, so buffer them into fewer write() calls.
+            # Non-ASCII is written as UTF-8, like orjson does, rather than escaped.
+            with open(tmp_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Don't leave a stray temporary file behind (it would show up as an uncommitted change)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def get_release_cache_path(repo_name):
+    """Get the path of the release cache file for a GitHub repository"""
+    return os.path.join(RELEASE_CACHE_DIR, repo_name.replace('/', '__') + ".json")
+
+def load_release_cache(repo_name):
+    """Load a repository's cached version and ETags from previous runs, or an empty cache if it's unusable"""
+    try:
+        cache = load_json(get_release_cache_path(repo_name))
+    except (OSError, ValueError):
+        cache = None
+    
+    # Anything unreadable or of the wrong shape is treated as no cache
+    if not isinstance(cache, dict) or "version" not in cache or not isinstance(cache.get("responses"), dict):
+        return {"version": None, "responses": {}}
+    return cache
+
+def save_release_cache(repo_name, cache):
+    """Persist a repository's cached version and ETags for the next run"""
+    os.makedirs(RELEASE_CACHE_DIR, exist_ok=True)
+    dump_json(cache, get_release_cache_path(repo_name))
+
+def store_cached_version(repo_name, version, responses=None):
+    """Cache a repository's looked-up version, and its refreshed ETag responses if given"""
+    # The cache is only an optimisation, so failing to write it doesn't lose the version
+    try:
+        cache = load_release_cache(repo_name)
+        cache["version"] = version
+        if responses is not None:
+            cache["responses"] = responses
+        save_release_cache(repo_name, cache)
+    except Exception as e:
+        print(f"Error saving release cache for {repo_name}: {str(e)}", file=sys.stderr)
+
+def is_release_cache_fresh(repo_name):
+    """Check whether a repository's release cache was written within the TTL"""
+    try:
+        return time.time() - os.path.getmtime(get_release_cache_path(repo_name)) < RELEASE_CACHE_TTL
+    except OSError:
+        return False
+
+def summarize_release(release):
+    """Keep only the release fields needed to pick a version"""
+    return {"tag_name": release["tag_name"], "prerelease": release["prerelease"]}
+
+def get_github_json(url, responses, deadline=None):
+    """Get release data from a GitHub API URL, or None if it doesn't exist
+
+    Sends the cached ETag so unchanged data comes back as a 304, which is
+    served from the cache and doesn't count against the rate limit.
+    """
+    cached = responses.get(url)
+    if not isinstance(cached, dict) or "etag" not in cached or "data" not in cached:
+        cached = None
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    response = github_get(url, deadline=deadline, headers=headers)
+    
+    if response.status_code == 304:
+        return cached["data"]
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    
+    data = response.json()
+    if isinstance(data, list):
+        data = [summarize_release(release) for release in data]
+    else:
+        data = summarize_release(data)
+    
+    if response.headers.get("ETag"):
+        responses[url] = {"etag": response.headers["ETag"], "data": data}
+    return data
+
+def clean_release_version(release, check_tag_format=None):
+    """Return the cleaned version of a release, or None if it doesn't match the tag format"""
+    # Clean the tag name (remove 'v' prefix if present)
+    version = release["tag_name"]
+    if version.startswith('v'):
+        version = version[1:]
         
-        # Find a valid release version
-        for release in releases:
-            # Skip prereleases if there are more than 1 release
-            if releases.totalCount > 1 and release.prerelease:
-                continue
-                
-            # Clean the tag name (remove 'v' prefix if present)
-            version = release.tag_name
-            if version.startswith('v'):
-                version = version[1:]
-                
-            # For karpenter, ensure it follows semver format
-            if check_tag_format == 'karpenter':
-                if '-controller-' in version:
-                    continue
-                if not re.match(r'^\d+\.\d+\.\d+$', version):
-                    continue
-                    
-            # For datadog agent, ensure it's a valid agent version
-            if check_tag_format == 'datadog':
-                if not re.match(r'^[0-9]+\.[0-9]+\.[0-9]+$', version):
-                    continue
-                    
+    # For karpenter, ensure it follows semver format
+    if check_tag_format == 'karpenter':
+        if CONTROLLER_TAG_RE.search(version):
+            return None
+        if not SEMVER_RE.match(version):
+            return None
+            
+    # For datadog agent, ensure it's a valid agent version
+    if check_tag_format == 'datadog':
+        if not SEMVER_RE.match(version):
+            return None
+            
+    return version
+
+def select_release_version(latest_release, releases, check_tag_format=None):
+    """Pick the version to use from a repository's latest release, falling back to its recent releases"""
+    # The latest stable release is usually all we need
+    if latest_release:
+        version = clean_release_version(latest_release, check_tag_format)
+        if version:
             return version
+    
+    # Skip prereleases if there are more than 1 release
+    skip_prereleases = len(releases) > 1
+    
+    # Find a valid release version
+    for release in releases:
+        if skip_prereleases and release["prerelease"]:
+            continue
             
+        version = clean_release_version(release, check_tag_format)
+        if version:
+            return version
+        
+    return None
+
+def find_release_version(repo_name, check_tag_format, responses, deadline=None):
+    """Find the latest release version matching the tag format in a GitHub repository"""
+    latest_release = get_github_json(f"{GITHUB_API_URL}/repos/{repo_name}/releases/latest", responses, deadline)
+    
+    # Recent releases are only needed when the latest doesn't match
+    # (one page of 100 so repos with many non-matching tags still need a single call)
+    releases = []
+    if not (latest_release and clean_release_version(latest_release, check_tag_format)):
+        releases = get_github_json(f"{GITHUB_API_URL}/repos/{repo_name}/releases?per_page=100", responses, deadline) or []
+    return select_release_version(latest_release, releases, check_tag_format)
+
+def build_releases_query(repo_names):
+    """Build a GraphQL query fetching the latest and recent releases of every repository, aliased r0, r1, ..."""
+    repo_queries = []
+    for i, repo_name in enumerate(repo_names):
+        owner, name = repo_name.split('/')
+        repo_queries.append(
+            f'r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ '
+            'latestRelease { tagName isPrerelease } '
+            'releases(first: 100, orderBy: {field: CREATED_AT, direction: DESC}) { nodes { tagName isPrerelease } } }'
+        )
+    return "{ " + " ".join(repo_queries) + " }"
+
+def summarize_graphql_release(node):
+    """Convert a GraphQL release node to the summarize_release() format"""
+    return {"tag_name": node["tagName"], "prerelease": node["isPrerelease"]}
+
+def get_graphql_releases(repo_names):
+    """Fetch the releases of several repositories in a single GraphQL request
+
+    Returns (latest release, recent releases) keyed by repository. Repositories
+    the query couldn't resolve are left out.
+    """
+    response = session.post(GITHUB_GRAPHQL_URL, json={"query": build_releases_query(repo_names)}, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    data = response.json().get("data") or {}
+    
+    releases = {}
+    for i, repo_name in enumerate(repo_names):
+        repo = data.get(f"r{i}")
+        if not repo:
+            continue
+        latest_release = summarize_graphql_release(repo["latestRelease"]) if repo["latestRelease"] else None
+        releases[repo_name] = (latest_release, [summarize_graphql_release(node) for node in repo["releases"]["nodes"]])
+    
+    return releases
+
+def get_fresh_cached_version(repo_name):
+    """Get a repository's cached version if it was looked up within the TTL"""
+    if not is_release_cache_fresh(repo_name):
         return None
+    return load_release_cache(repo_name)["version"]
+
+def get_github_release_info(repo_name, check_tag_format=None, deadline=None):
+    """Get the latest release version from GitHub repository
+
+    Returns (version, responses), where responses are the ETag responses to
+    cache with it, or None if a fresh cached version was reused or the lookup failed.
+    """
+    try:
+        # A recent lookup is reused without any API calls
+        cached_version = get_fresh_cached_version(repo_name)
+        if cached_version:
+            return cached_version, None
+        
+        responses = load_release_cache(repo_name)["responses"]
+        return find_release_version(repo_name, check_tag_format, responses, deadline), responses
     except Exception as e:
         print(f"Error fetching GitHub release info for {repo_name}: {str(e)}", file=sys.stderr)
-        return None
+        return None, None
+
+def get_check_tag_format(component_name):
+    """Get the tag format a component's releases are checked against, if any"""
+    return component_name if component_name in ['karpenter', 'datadog'] else None
+
+def fetch_graphql_versions(components):
+    """Look up the latest versions of components in one batched GraphQL request, keyed by component name"""
+    try:
+        releases = get_graphql_releases([config["github_repo"] for config in components.values()])
+    except Exception as e:
+        print(f"Error fetching GitHub releases via GraphQL: {str(e)}", file=sys.stderr)
+        return {}
+    
+    latest_versions = {}
+    for component_name, config in components.items():
+        repo_name = config["github_repo"]
+        if repo_name not in releases:
+            continue
+        
+        latest_release, recent_releases = releases[repo_name]
+        version = select_release_version(latest_release, recent_releases, get_check_tag_format(component_name))
+        latest_versions[component_name] = version
+        
+        # Keep the REST ETags so later fallbacks can still make conditional requests
+        store_cached_version(repo_name, version)
+    
+    return latest_versions
 
-def update_metadata_value(metadata, key_path, value):
-    """Update a nested key in metadata dict using dot notation path"""
-    keys = key_path.split('.')
-    current = metadata
+def fetch_latest_versions(components):
+    """Look up the latest version of every component, keyed by component name"""
+    latest_versions = {}
+    
+    # GraphQL needs a token, but fetches every stale component in a single request
+    if os.environ.get("GITHUB_TOKEN"):
+        stale = {name: config for name, config in components.items()
+                 if not get_fresh_cached_version(config["github_repo"])}
+        if stale:
+            latest_versions.update(fetch_graphql_versions(stale))
+    
+    remaining = {name: config for name, config in components.items() if name not in latest_versions}
+    if not remaining:
+        return latest_versions
     
-    # Navigate to the nested location
-    for k in keys[:-1]:
-        if k not in current:
-            return False
-        current = current[k]
+    # Lookups are network-bound, so one worker per component overlaps all the round-trips.
+    # Workers are daemon threads so a lookup still running past the deadline can't keep the script alive.
+    deadline = time.time() + LOOKUP_TIMEOUT
+    results = queue.Queue()
+    results_lock = threading.Lock()
+    dropped = threading.Event()
     
-    # Set the value if there's a change
-    last_key = keys[-1]
-    if last_key in current and current[last_key] != value:
-        current[last_key] = value
-        return True
+    def lookup(component_name, config):
+        version, responses = get_github_release_info(config["github_repo"], get_check_tag_format(component_name), deadline)
+        
+        # Only lookups that will still be applied are cached and reported
+        with results_lock:
+            if dropped.is_set():
+                return
+            if responses is not None:
+                store_cached_version(config["github_repo"], version, responses)
+            results.put((component_name, version))
+    
+    for component_name, config in remaining.items():
+        threading.Thread(target=lookup, args=(component_name, config), daemon=True).start()
+    
+    # A failed lookup only drops its own component
+    for _ in remaining:
+        try:
+            component_name, version = results.get(timeout=max(0, deadline - time.time()))
+        except queue.Empty:
+            break
+        latest_versions[component_name] = version
+    else:
+        return latest_versions
     
-    return False
+    # Slow lookups are dropped rather than holding up the other components
+    with results_lock:
+        dropped.set()
+        while not results.empty():
+            component_name, version = results.get_nowait()
+            latest_versions[component_name] = version
+    for component_name in remaining:
+        if component_name not in latest_versions:
+            print(f"Timed out fetching latest version for {component_name}", file=sys.stderr)
+    
+    return latest_versions
+
+def resolve_metadata_keys(metadata, components):
+    """Resolve every component's dot notation key paths to (component, parent dict, leaf key) entries"""
+    resolved = []
+    
+    for component_name, config in components.items():
+        # Some components share a version across several keys
+        key_paths = config["metadata_key"] if isinstance(config["metadata_key"], list) else [config["metadata_key"]]
+        
+        # Navigate to each parent once and resolve all of its sibling keys together
+        for parent_path, group in itertools.groupby(key_paths, key=lambda k: k.rpartition('.')[0]):
+            try:
+                parent = functools.reduce(operator.getitem, parent_path.split('.'), metadata) if parent_path else metadata
+            except (KeyError, TypeError):
+                continue
+            
+            # Only existing keys are updated
+            for key_path in group:
+                last_key = key_path.rpartition('.')[2]
+                if last_key in parent:
+                    resolved.append((component_name, parent, last_key))
+    
+    return resolved
 
 def main():
     # Path to metadata file
@@ -95,8 +469,7 @@ def main():
     
     # Load existing metadata
     try:
-        with open(metadata_file, 'r') as f:
-            metadata = json.load(f)
+        metadata = load_json(metadata_file)
     except FileNotFoundError:
         print(f"Error: Metadata file {metadata_file} not found", file=sys.stderr)
         sys.exit(1)
@@ -104,37 +477,29 @@ def main():
         print(f"Error: Metadata file {metadata_file} is not valid JSON", file=sys.stderr)
         sys.exit(1)
     
+    # Resolve where each component's version lives in the metadata up front
+    resolved_keys = resolve_metadata_keys(metadata, COMPONENTS)
+    
     changes = []
     
-    # Check each component for updates
-    for component_name, config in COMPONENTS.items():
-        # Get latest version from GitHub
-        check_tag_format = component_name if component_name in ['karpenter', 'datadog'] else None
-        latest_version = get_github_release_info(config["github_repo"], check_tag_format)
-        
-        if not latest_version:
-            continue
-        
-        # Update metadata for this component
-        updated = False
-        if isinstance(config["metadata_key"], list):
-            # Handle multiple keys for the same component
-            for key_path in config["metadata_key"]:
-                if update_metadata_value(metadata, key_path, latest_version):
-                    changes.append(f"{component_name}: {key_path.split('.')[-1]} updated to {latest_version}")
-                    updated = True
-        else:
-            # Single key for component
-            if update_metadata_value(metadata, config["metadata_key"], latest_version):
-                changes.append(f"{component_name}: {config['metadata_key'].split('.')[-1]} updated to {latest_version}")
-                updated = True
+    # Fetch the latest versions for all components concurrently
+    latest_versions = fetch_latest_versions(COMPONENTS)
     
-    # Save updated metadata
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    # Apply updates on the main thread, in component order
+    for component_name, parent, last_key in resolved_keys:
+        latest_version = latest_versions.get(component_name)
+        
+        # Set the value if there's a change
+        if latest_version and parent[last_key] != latest_version:
+            parent[last_key] = latest_version
+            changes.append(f"{component_name}: {last_key} updated to {latest_version}")
     
-    # Output changes for the PR description
+    # Nothing to save or report when every component is already up to date
     if changes:
+        # Save updated metadata
+        dump_json(metadata, metadata_file)
+        
+        # Output changes for the PR description
         changes_str = "\n".join(changes)
         # GitHub Actions output
         with open(os.environ.get('GITHUB_OUTPUT', '/dev/stdout'), 'a') as f: